@@ -7,19 +7,14 @@ __version__ = '0.0.2'
 __author__ = 'Rémi DEBETTE'
 __license__ = 'Apache 2'
 
-from .api import get, Api, SearchForm, Document
+from .api import get, get_with_client, Api, SearchForm, Document
+from .connection import get_default_client, aclose_default_client
 from .fragments import Fragment
 
 # Set a default logger to prevent "No handler found" warnings
 import logging
-try:  # Python >=2.7
-    from logging import NullHandler
-except ImportError:
-    class NullHandler(logging.Handler):
-        def emit(self, record):
-            pass
 
-logging.getLogger(__name__).addHandler(NullHandler())
+logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 EXPERIMENTS_COOKIE = "io.prismic.experiment"
 PREVIEW_COOKIE = "io.prismic.preview"
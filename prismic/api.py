@@ -10,14 +10,15 @@ This module implements the Prismic API.
 
 from __future__ import (absolute_import, division, print_function, unicode_literals)
 
-import sys
-from contextlib import asynccontextmanager
-from copy import copy, deepcopy
+from copy import copy
+from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import unquote
 
 import httpx
 from aiocache import Cache
 
-from .connection import get_json, urlparse
+from .connection import get_json, DEFAULT_CLIENT_KWARGS
 from .experiments import Experiments
 from . import predicates
 from .exceptions import RefMissing
@@ -28,11 +29,13 @@ import logging
 
 log = logging.getLogger(__name__)
 
+def get(url, access_token=None, cache=None, client=None, **client_kwargs):
+    """Fetches the prismic api JSON. Yields :class:`~Api` object.
 
-@asynccontextmanager
-async def get(url, access_token=None, cache=None, **client_kwargs):
-    """Fetches the prismic api JSON. Generates only one httpx client for the async context.
-    Yields :class:`~Api` object.
+    By default, the requests go through the httpx client shared by the running event loop
+    (see :func:`~prismic.connection.get_default_client`), so that connections are pooled across contexts.
+    Passing ``client_kwargs`` creates a dedicated client instead, which is closed when leaving the context.
+    A client passed as ``client`` is used as is and left open.
 
     Usage:
     >>> import prismic
@@ -42,17 +45,47 @@ async def get(url, access_token=None, cache=None, **client_kwargs):
     :param url: URL to the api of the repository (mandatory).
     :param access_token: The access token (optional).
     :param cache: The cache object. Optional, will default to a in-memory cache if None is passed.
+    :param client: The httpx client (optional). Its lifecycle is left to the caller.
+    :param client_kwargs: Arguments of the dedicated httpx client to create (optional).
     """
-    if cache is None:
-        cache = Cache(Cache.MEMORY)
-
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        yield Api(
-            await get_json(url, access_token=access_token, cache=cache, ttl=5, client=client),
-            access_token,
-            cache,
-            client
-        )
+    return _ApiContext(url, access_token, cache, client, client_kwargs)
+
+
+class _ApiContext(object):
+    """Async context manager returned by :func:`get`, owning the httpx client it may have created."""
+
+    def __init__(self, url, access_token, cache, client, client_kwargs):
+        self._url = url
+        self._access_token = access_token
+        self._cache = Cache(Cache.MEMORY) if cache is None else cache
+        self._client = client
+        self._client_kwargs = client_kwargs
+        self._owns_client = False
+
+    async def __aenter__(self):
+        client = self._client
+        if client is None and self._client_kwargs:
+            client = self._client = httpx.AsyncClient(**{**DEFAULT_CLIENT_KWARGS, **self._client_kwargs})
+            self._owns_client = True
+        # Without a client, each request resolves the default client, which is re-created once closed
+
+        try:
+            data = await get_json(
+                self._url, access_token=self._access_token, cache=self._cache, default_ttl=5, client=client
+            )
+        except BaseException:
+            await self._aclose()
+            raise
+        return Api(data, self._access_token, self._cache, client)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._aclose()
+
+    async def _aclose(self):
+        if self._owns_client:
+            self._owns_client = False
+            client, self._client = self._client, None
+            await client.aclose()
 
 
 async def get_with_client(url, access_token=None, cache=None, client=None):
@@ -62,19 +95,28 @@ async def get_with_client(url, access_token=None, cache=None, client=None):
     :param url: URL to the api of the repository (mandatory).
     :param access_token: The access token (optional).
     :param cache: The cache object. Optional, will default to a in-memory cache if None is passed.
-    :param client: The httpx client. If not passed, one client will be created for each subsequent http request.
+    :param client: The httpx client. If not passed, the shared default client will be used for every subsequent
+    http request.
     """
     if cache is None:
         cache = Cache(Cache.MEMORY)
 
     return Api(
-        await get_json(url, access_token=access_token, cache=cache, ttl=5, client=client),
+        await get_json(url, access_token=access_token, cache=cache, default_ttl=5, client=client),
         access_token,
         cache,
         client
     )
 
 
+@lru_cache(maxsize=1024)
+def _serialize_string(field):
+    """Serializes a string predicate argument. The same few field paths and values tend to be queried over and over."""
+    if field.startswith(('my.', 'document.')) or field == 'document':
+        return field
+    return '"' + field + '"'
+
+
 class Api(object):
     """
     A Prismic API, pointing to a specific repository. Use prismic.api.get() to fetch one.
@@ -86,25 +128,29 @@ class Api(object):
     :ivar str access_token: current access token (may be None)
     """
 
+    __slots__ = ("cache", "client", "refs", "_refs_by_label", "bookmarks", "types", "tags", "forms", "experiments",
+                 "oauth_initiate", "oauth_token", "access_token", "master")
+
     def __init__(self, data, access_token, cache, client):
         self.cache = cache
         self.client = client
         self.refs = [Ref(ref) for ref in data.get("refs")]
+        # Built from the end so that the first ref wins when several share a label
+        self._refs_by_label = {ref.label: ref for ref in reversed(self.refs)}
         self.bookmarks = data.get("bookmarks")
         self.types = data.get("types")
         self.tags = data.get("tags")
         self.forms = data.get("forms")
-        for name in self.forms:
-            fields = self.forms[name].get("fields")
-            for field in fields:
-                if field == "q":
-                    fields[field].update({"multiple": True})
+        for form in self.forms.values():
+            fields = form.get("fields")
+            if fields is not None and "q" in fields:
+                fields["q"]["multiple"] = True
         self.experiments = Experiments.parse(data.get("experiments"))
         self.oauth_initiate = data.get("oauth_initiate")
         self.oauth_token = data.get("oauth_token")
         self.access_token = access_token
 
-        self.master = ([ref for ref in self.refs if ref.is_master_ref][:1] or [None])[0]
+        self.master = next((ref for ref in self.refs if ref.is_master_ref), None)
         if not self.master:
             log.error("No master reference found")
 
@@ -118,12 +164,12 @@ class Api(object):
 
         :return: the URL to redirect the user to
         """
-        resp = await get_json(token, client=self.client)
+        resp = await get_json(token, cache=self.cache, ttl=60, client=self.client)
         main_document_id = resp.get("mainDocument")
         if main_document_id is None:
             return default_url
         doc = await self.get_by_id(main_document_id, ref=token)
-        if doc is None == 0:
+        if doc is None:
             return default_url
         return link_resolver(doc.as_link())
 
@@ -133,8 +179,7 @@ class Api(object):
 
         :param label: Name of the label.
         """
-        ref = [ref for ref in self.refs if ref.label == label]
-        return ref[0] if ref else None
+        return self._refs_by_label.get(label)
 
     def get_master(self):
         """Returns current master :class:`~Ref` object."""
@@ -197,20 +242,41 @@ class Api(object):
 class Ref(object):
     """
     A Prismic.io Reference (corresponds to a release)
+
+    :ivar datetime scheduled_at: publication date of the release, if it is scheduled (may be None)
     """
 
+    __slots__ = ("id", "ref", "label", "is_master_ref", "scheduled_at")
+
     def __init__(self, data):
         self.id = data.get("id")
         self.ref = data.get("ref")
         self.label = data.get("label")
         self.is_master_ref = data.get("isMasterRef")
-        self.scheduled_at = data.get("scheduledAt")
+        self.scheduled_at = Ref.parse_date(data.get("scheduledAt"))
+
+    @staticmethod
+    def parse_date(value):
+        """The API sends dates as timestamps in milliseconds, ISO 8601 strings are accepted too.
+        An invalid date is logged and ignored, so that it doesn't prevent loading the Api."""
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+        try:
+            # fromisoformat only accepts a trailing "Z" from Python 3.11
+            return datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+        except (TypeError, ValueError):
+            log.warning("Ignoring the invalid scheduled date %r", value)
+            return None
 
 
 class SearchForm(object):
     """Form to search for documents. Most of the methods return self object to allow chaining.
     """
 
+    __slots__ = ("action", "method", "enctype", "fields", "data", "access_token", "cache", "client")
+
     def __init__(self, form, access_token, cache, client):
         self.action = form.get("action")
         self.method = form.get("method")
@@ -236,15 +302,12 @@ class SearchForm(object):
     @staticmethod
     def _serialize(field):
         if isinstance(field, string_types):
-            if field.startswith('my.') or field.startswith('document.') or field == 'document':
-                return field
-            else:
-                return '"' + field + '"'
-        elif hasattr(field, '__iter__'):
-            strings = []
-            for item in field:
-                strings.append(SearchForm._serialize(item))
-            return "[" + ", ".join(strings) + "]"
+            return _serialize_string(field)
+        elif isinstance(field, (int, float)):
+            return str(field)
+        # Lists and tuples are checked first as hasattr() is much slower, but any iterable is accepted
+        elif isinstance(field, (list, tuple)) or hasattr(field, '__iter__'):
+            return "[" + ", ".join(map(SearchForm._serialize, field)) + "]"
         else:
             return str(field)
 
@@ -258,27 +321,25 @@ class SearchForm(object):
         if isinstance(argv[0], string_types):
             q = argv[0]
         else:
-            q = "["
+            serialize = SearchForm._serialize
+            parts = ["["]
             for predicate in argv:
-                op = predicate[0]
-                args = []
-                for arg in predicate[1:]:
-                    args.append(SearchForm._serialize(arg))
-                q += "[:d = %(op)s(%(args)s)]" % {
-                    'op': op,
-                    'args': ", ".join(args)
-                }
-            q += "]"
+                args = ", ".join(map(serialize, predicate[1:]))
+                parts.append(f"[:d = {predicate[0]}({args})]")
+            parts.append("]")
+            q = "".join(parts)
         return self.set('q', q)
 
     def set(self, field, value):
         form_field = self.fields.get(field)
         if form_field and form_field.get("multiple"):
-            if not self.data.get(field):
-                self.data.update({field: []})
-            self.data[field].append(value)
+            values = self.data.get(field)
+            if values:
+                values.append(value)
+            else:
+                self.data[field] = [value]
         else:
-            self.data.update({field: value})
+            self.data[field] = value
         return self
 
     def orderings(self, orderings):
@@ -355,16 +416,21 @@ class SearchForm(object):
     async def count(self):
         """Count the total number of results
         """
-        resp = await copy(self).pageSize(1).submit()
-        return resp.total_results_size
+        form = copy(self).page_size(1)
+        form.submit_assert_preconditions()
+        # Only the total is needed, there is no point in building the Response and its Document
+        resp = await get_json(form.action, form.data, form.access_token, form.cache, client=form.client)
+        return resp.get("total_results_size")
 
     def __copy__(self):
         cp = type(self)({}, self.access_token, self.cache, self.client)
-        cp.action = deepcopy(self.action)
-        cp.method = deepcopy(self.method)
-        cp.enctype = deepcopy(self.enctype)
-        cp.fields = deepcopy(self.fields)
-        cp.data = deepcopy(self.data)
+        cp.action = self.action
+        cp.method = self.method
+        cp.enctype = self.enctype
+        # The fields description comes from the Api and is never mutated by the form, it can be shared.
+        cp.fields = self.fields
+        # Values are strings or numbers, except for the "multiple" fields which are lists appended to by `set`.
+        cp.data = {field: list(value) if isinstance(value, list) else value for field, value in self.data.items()}
         return cp
 
 
@@ -382,6 +448,9 @@ class Response(object):
     :ivar int results_size: number of results actually returned for the current page
     """
 
+    __slots__ = ("_data", "documents", "page", "next_page", "prev_page", "results_per_page", "total_pages",
+                 "total_results_size", "results_size")
+
     def __init__(self, data):
         self._data = data
         self.documents = [Document(d) for d in data.get("results")]
@@ -394,7 +463,13 @@ class Response(object):
         self.results_size = data.get("results_size")
 
     def __getattr__(self, name):
-        return self._data.get(name)
+        # Only called for the keys of the response that are not slots, such as "version" or "license"
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
 
     def __repr__(self):
         return "Response %s" % self._data
@@ -412,34 +487,20 @@ class Document(Fragment.WithFragments):
     :ivar array<str> slugs:
     """
 
+    __slots__ = ("_data", "slugs")
+
     def __init__(self, data):
-        Fragment.WithFragments.__init__(self, {})
         self._data = data
 
+        doc_type = self.type
         fragments = {}
         if "data" in data:
-            fragments = data.get("data").get(self.type)
-        for (fragment_name, fragment_value) in list(fragments.items()):
-            f_key = "%s.%s" % (self.type, fragment_name)
-
-            if isinstance(fragment_value, list):
-                for index, fragment_value_element in enumerate(fragment_value):
-                    self.fragments["%s[%s]" % (f_key, index)] = Fragment.from_json(
-                        fragment_value_element)
-
-            elif isinstance(fragment_value, dict):
-                self.fragments[f_key] = Fragment.from_json(fragment_value)
+            fragments = data.get("data").get(doc_type)
+        Fragment.WithFragments.__init__(self, self.parse_fragments(doc_type, fragments))
 
         self.slugs = ["-"]
         if data.get("slugs") is not None:
-            self.slugs = [Document.__unquote(slug) for slug in data.get("slugs")]
-
-    @staticmethod
-    def __unquote(s):
-        if sys.version_info >= (3, 0):
-            return urlparse.unquote(s)
-        else:
-            return urlparse.unquote(s.encode('utf8')).decode('utf8')
+            self.slugs = [unquote(slug) for slug in data.get("slugs")]
 
     def as_link(self):
         """
@@ -454,8 +515,9 @@ class Document(Fragment.WithFragments):
         })
 
     def __getattr__(self, name):
-        if name.startswith('__'):
-            raise AttributeError
+        # Optional document metadata (uid, href, ...) may be missing from the response and default to None
+        if name.startswith('_'):
+            raise AttributeError(name)
         return self._data.get(name, None)
 
     @property
@@ -12,6 +12,13 @@ import tempfile
 import shelve
 from datetime import datetime
 
+from aiocache.serializers import BaseSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class NoCache(object):
     """
@@ -27,6 +34,26 @@ class NoCache(object):
         return None
 
 
+class OrjsonSerializer(BaseSerializer):
+    """
+    An aiocache serializer storing values as orjson-encoded bytes. Requires the `orjson` package.
+
+    The in-memory cache used by default stores the parsed JSON as is and needs no serializer. For remote
+    backends, this avoids the slower stdlib json round trip of aiocache's default serializer:
+    ``Cache(Cache.REDIS, serializer=OrjsonSerializer())``.
+    """
+
+    DEFAULT_ENCODING = None
+
+    def dumps(self, value):
+        return orjson.dumps(value)
+
+    def loads(self, value):
+        if value is None:
+            return None
+        return orjson.loads(value)
+
+
 # TODO: This implementation of ShelveCache is blocking and should not be used
 class ShelveCache(object):
     """
@@ -9,22 +9,60 @@ This module implements the Prismic Connection handlers.
 """
 from httpx import InvalidURL
 
-try:  # 2.7
-    import urllib.parse as urlparse
-except ImportError:  # 3.x
-    import urllib as urlparse
-
+import asyncio
 import httpx
-import json
-import re
 import platform
+import random
+import weakref
 from .exceptions import (InvalidTokenError, AuthorizationNeededError,
                          HTTPError, InvalidURLError)
 from .cache import NoCache
 from . import __version__ as prismic_version
 
+try:  # orjson is an optional, faster drop-in for the json module
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+#: Relative variation applied to the cache durations
+TTL_JITTER = 0.1
+
+#: Arguments of the httpx clients created by the kit. Prismic serves its API over HTTP/2, which lets concurrent
+#: queries share a single connection. The arguments given to :func:`prismic.get` take precedence.
+DEFAULT_CLIENT_KWARGS = {
+    "http2": True,
+    "limits": httpx.Limits(max_keepalive_connections=100, max_connections=200, keepalive_expiry=30),
+}
+
+# The pooled connections of a client can't outlive its event loop, so there is one default client per loop
+_default_clients = weakref.WeakKeyDictionary()
+_inflight = {}
+
+
+def get_default_client():
+    """Returns the httpx client shared by every call of the running event loop that is not given a client of its own.
+
+    The client is created lazily on first use and re-created if it was closed. Close it with
+    :func:`aclose_default_client` before the loop shuts down.
+    """
+    loop = asyncio.get_running_loop()
+    client = _default_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _default_clients[loop] = httpx.AsyncClient(**DEFAULT_CLIENT_KWARGS)
+    return client
+
+
+async def aclose_default_client():
+    """Closes the shared httpx client of the running event loop, if any.
+
+    A new one will be created on the next call needing it.
+    """
+    client = _default_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
 
-async def get_using_client(full_url, client=None):
+async def get_using_client(url, params=None, client=None):
     headers = {
         "Accept": "application/json",
         "User-Agent": "Prismic-httpx-python-kit/%s Python/%s" % (
@@ -34,16 +72,20 @@ async def get_using_client(full_url, client=None):
     }
 
     if client is None:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(full_url, headers=headers)
+        client = get_default_client()
 
-    else:
-        response = await client.get(full_url, headers=headers)
+    response = await client.get(url, params=params, headers=headers)
 
     return response, response.status_code, response.headers
 
 
-async def get_json(url, params=None, access_token=None, cache=None, ttl=None, client=None):
+async def get_json(url, params=None, access_token=None, cache=None, ttl=None, client=None, default_ttl=None):
+    """Fetches and caches the JSON at `url`.
+
+    The result is cached for `ttl` seconds if given, else for the max-age sent by the server, else for `default_ttl`
+    seconds. The duration is jittered by +/- :data:`TTL_JITTER` so that entries cached together do not all expire at
+    the same time. A max-age of 0 sent by the server, or a `ttl` of 0, disables the caching of the result.
+    """
     full_params = dict() if params is None else params.copy()
     if cache is None:
         # TODO: Reimplement ShelveCache using `aiofiles`
@@ -51,17 +93,55 @@ async def get_json(url, params=None, access_token=None, cache=None, ttl=None, cl
         cache = NoCache()
     if access_token is not None:
         full_params["access_token"] = access_token
-    full_url = url if len(full_params) == 0 else (url + "?" + urlparse.urlencode(full_params, doseq=True))
-    cached = await cache.get(full_url)
+    cache_key = get_cache_key(url, full_params)
+    cached = await cache.get(cache_key)
     if cached is not None:
         return cached
+
+    # Concurrent misses on the same request of a loop wait for the first one instead of fetching it again
+    loop = asyncio.get_running_loop()
+    inflight_key = (cache_key, id(client), loop)
+    pending = _inflight.get(inflight_key)
+    while pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                # This caller was cancelled itself
+                raise
+        # The caller fetching the request was cancelled, the waiters must not be: take over from it
+        pending = _inflight.get(inflight_key)
+
+    future = loop.create_future()
+    _inflight[inflight_key] = future
+    try:
+        json_result = await fetch_json(url, full_params, access_token, cache, cache_key, ttl, client, default_ttl)
+        future.set_result(json_result)
+        return json_result
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved, there may be no other coroutine waiting for it
+        future.exception()
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        del _inflight[inflight_key]
+
+
+async def fetch_json(url, params, access_token, cache, cache_key, ttl, client, default_ttl):
     try:
-        result, status_code, headers = await get_using_client(full_url, client)
+        result, status_code, headers = await get_using_client(url, params, client)
         if status_code == 200:
-            json_result = result.json()
-            expire = ttl or get_max_age(headers)
-            if expire is not None:
-                await cache.set(full_url, json_result, expire)
+            json_result = json_loads(result.content)
+            expire = ttl
+            if expire is None:
+                # A max-age of 0 means the response must not be cached, not that there is no max-age
+                expire = get_max_age(headers)
+                if expire is None:
+                    expire = default_ttl
+            if expire:
+                await cache.set(cache_key, json_result, jitter_ttl(expire))
             return json_result
         elif status_code == 401:
             if len(access_token) == 0:
@@ -74,10 +154,23 @@ async def get_json(url, params=None, access_token=None, cache=None, ttl=None, cl
         raise InvalidURLError(e)
 
 
+def jitter_ttl(ttl):
+    return max(1, round(ttl * random.uniform(1 - TTL_JITTER, 1 + TTL_JITTER)))
+
+
+def get_cache_key(url, params):
+    """Builds the cache key of a request without url-encoding its parameters."""
+    if not params:
+        return url
+    return "%s %r" % (url, sorted(params.items()))
+
+
 def get_max_age(headers):
     expire_header = headers.get("Cache-Control", None)
-    if expire_header is not None:
-        m = re.match("max-age=(\d+)", expire_header)
-        if m:
-            return int(m.group(1))
-    return None
+    if not expire_header:
+        return None
+    _, _, max_age = expire_header.partition("max-age=")
+    end = 0
+    while end < len(max_age) and max_age[end].isdecimal():
+        end += 1
+    return int(max_age[:end]) if end else None
@@ -18,6 +18,10 @@ class Experiments(object):
     def __init__(self, draft, running):
         self.draft = draft
         self.running = running
+        # Running experiments by google id, the first one wins like in a linear search
+        self._by_google_id = {}
+        for experiment in running:
+            self._by_google_id.setdefault(experiment.google_id, experiment)
 
     def ref_from_cookie(self, cookie):
         """
@@ -28,13 +32,16 @@ class Experiments(object):
         """
         if cookie is None:
             return None
-        splitted = cookie.strip().split("%20")
-        experiment = None
-        if len(splitted) >= 2:
-            experiment = next((exp for exp in self.running if exp.google_id == splitted[0]), None)
+        google_id, separator, variation = cookie.strip().partition("%20")
+        if not separator:
+            return None
+        experiment = self._by_google_id.get(google_id)
         if experiment is None:
             return None
-        var_index = int(splitted[1])
+        try:
+            var_index = int(variation.partition("%20")[0])
+        except ValueError:
+            return None
         if -1 < var_index < len(experiment.variations):
             return experiment.variations[var_index].ref
 
@@ -7,63 +7,70 @@ prismic.fragments
 This module implements the Fragments.
 
 """
-from __future__ import (absolute_import, division, print_function, unicode_literals)
-
 import html
-from collections import namedtuple, defaultdict
+from functools import lru_cache, partial
+from itertools import groupby
+from operator import itemgetter
 import logging
 import re
+import sys
 import datetime
 
 log = logging.getLogger(__name__)
 
+_DATE_SPLIT = re.compile(r'\D').split
 
-class FragmentElement(object):
-    pass
 
+@lru_cache(maxsize=4096)
+def _text_as_html(value):
+    return f"""<span class="text">{html.escape(value)}</span>"""
 
-class Fragment(object):
 
-    _types = None
+class FragmentElement:
+    __slots__ = ()
 
-    @classmethod
-    def from_json(cls, data):
-        """Create a corresponding fragment object from json."""
 
-        if not cls._types:
-            cls._types = {
-                "Image":          Fragment.Image,
-                "Color":          Fragment.Color,
-                "Text":           Fragment.Text,
-                "Select":         Fragment.Text,
-                "Number":         Fragment.Number,
-                "Range":          Fragment.Range,
-                "Date":           Fragment.Date,
-                "Timestamp":      Fragment.Timestamp,
-                "StructuredText": StructuredText,
-                "Link.document":  Fragment.DocumentLink,
-                "Link.file":      Fragment.FileLink,
-                "Link.web":       Fragment.WebLink,
-                "Link.image":     Fragment.ImageLink,
-                "Embed":          Fragment.Embed,
-                "GeoPoint":       Fragment.GeoPoint,
-                "Group":          Fragment.Group,
-                "SliceZone":      Fragment.SliceZone
-            }
+class Fragment:
+
+    @staticmethod
+    def from_json(data):
+        """Create a corresponding fragment object from json."""
 
         fragment_type = data.get("type")
-        f_type = cls._types.get(fragment_type)
+        f_type = _FRAGMENT_TYPES.get(fragment_type)
 
         if f_type:
             return f_type(data.get("value"))
 
-        log.warning("fragment_type not found: %s" % fragment_type)
+        log.warning("fragment_type not found: %s", fragment_type)
 
-    class WithFragments(object):
+    class WithFragments:
+
+        __slots__ = ("fragments",)
 
         def __init__(self, fragments):
             self.fragments = fragments
 
+        @staticmethod
+        def parse_fragments(doc_type, fragments):
+            """Parse the json fragments of a document into fragment objects keyed by field name.
+
+            Repeated fields are keyed by index, e.g. ``article.author[0]``.
+            """
+            parsed = {}
+            from_json = Fragment.from_json
+            # json decoded values are exactly lists and dicts, so this loop checks types rather than isinstance
+            for fragment_name, fragment_value in fragments.items():
+                f_key = f"{doc_type}.{fragment_name}"
+
+                if type(fragment_value) is list:
+                    for index, fragment_value_element in enumerate(fragment_value):
+                        parsed[f"{f_key}[{index}]"] = from_json(fragment_value_element)
+
+                elif type(fragment_value) is dict:
+                    parsed[f_key] = from_json(fragment_value)
+            return parsed
+
         def get(self, field):
             return self.fragments.get(field, None)
 
@@ -71,8 +78,13 @@ class Fragment(object):
             return self.fragments.get(field, None)
 
         def get_all(self, field):
-            indexed_key = "^%s(\[\d+\])?$" % field
-            return list(v for k, v in list(self.fragments.items()) if re.match(indexed_key, k))
+            # Matches `field` itself and its indexed keys `field[0]`, `field[1]`...
+            prefix = field + "["
+            start = len(prefix)
+            return [
+                v for k, v in self.fragments.items()
+                if k == field or (k.startswith(prefix) and k.endswith("]") and k[start:-1].isdecimal())
+            ]
 
         def get_fragment_type(self, field, f_type):
             fragment = self.fragments.get(field)
@@ -80,9 +92,10 @@ class Fragment(object):
 
         def get_image(self, field, view="main"):
             fragment = self.get_field(field)
-            if isinstance(fragment, Fragment.Image):
-                return fragment.get_view(view) if fragment else None
-            if view == "main" and isinstance(fragment, StructuredText):
+            fragment_type = type(fragment)
+            if fragment_type is Fragment.Image:
+                return fragment.get_view(view)
+            if view == "main" and fragment_type is StructuredText:
                 image = fragment.get_image()
                 return image.view if image else None
             return None
@@ -98,9 +111,8 @@ class Fragment(object):
 
         def get_text(self, field):
             fragment = self.fragments.get(field)
-            if isinstance(fragment, StructuredText):
-                texts = [block.text for block in fragment.blocks if isinstance(
-                    block, Text)]
+            if type(fragment) is StructuredText:
+                texts = [block.text for block in fragment.blocks if type(block) in _TEXT_BLOCK_TYPES]
                 return "\n".join(texts) if texts else None
             elif fragment is None:
                 return None
@@ -149,41 +161,41 @@ class Fragment(object):
             :return: array<DocumentLink>
             """
             result = []
-            for (name, fragment) in list(self.fragments.items()):
-                if isinstance(fragment, Fragment.DocumentLink):
-                    result.append(fragment)
-                elif isinstance(fragment, Fragment.Group):
+            append = result.append
+            for fragment in self.fragments.values():
+                fragment_type = type(fragment)
+                if fragment_type is Fragment.DocumentLink:
+                    append(fragment)
+                elif fragment_type is Fragment.Group:
                     for groupdoc in fragment.value:
-                        result = result + groupdoc.linked_documents
-                elif isinstance(fragment, StructuredText):
+                        result.extend(groupdoc.linked_documents)
+                elif fragment_type is StructuredText:
                     for block in fragment.blocks:
-                        if isinstance(block, Text):
+                        if type(block) in _TEXT_BLOCK_TYPES:
                             for span in block.spans:
-                                if isinstance(span, Span.Hyperlink):
-                                    if isinstance(span.link, Fragment.DocumentLink):
-                                        result.append(span.link)
+                                if type(span) is Span.Hyperlink and type(span.link) is Fragment.DocumentLink:
+                                    append(span.link)
             return result
 
         @staticmethod
         def fragment_to_html(fragment, link_resolver, html_serializer=None):
-            if isinstance(fragment, StructuredText):
-                return fragment.as_html(link_resolver, html_serializer)
-            if isinstance(fragment, Fragment.Group)\
-                    or isinstance(fragment, Fragment.SliceZone)\
-                    or isinstance(fragment, Fragment.DocumentLink)\
-                    or isinstance(fragment, Fragment.Image)\
-                    or isinstance(fragment, Fragment.Image.View):
-                return fragment.as_html(link_resolver)
+            render = _FRAGMENT_RENDERERS.get(type(fragment)) or _find_base_renderer(_FRAGMENT_RENDERERS, fragment)
+            if render is not None:
+                return render(fragment, link_resolver, html_serializer)
             elif fragment:
                 return fragment.as_html
             return None
 
         def as_html(self, link_resolver):
             html_list = []
-            for key, fragment in list(self.fragments.items()):
-                html_list.append("""<section data-field="%s">""" % key)
-                html_list.append(self.fragment_to_html(fragment, link_resolver))
-                html_list.append("""</section>""")
+            extend = html_list.extend
+            fragment_to_html = self.fragment_to_html
+            for key, fragment in self.fragments.items():
+                extend((
+                    f"""<section data-field="{key}">""",
+                    fragment_to_html(fragment, link_resolver),
+                    """</section>""",
+                ))
 
             return ''.join(html_list)
 
@@ -205,23 +217,19 @@ class Fragment(object):
     # Links
 
     class Link(FragmentElement):
+        __slots__ = ()
 
         @staticmethod
         def parse(data):
             if data is None:
                 return None
-            hyperlink_type = data.get("type")
-            return {
-                "Link.web": Fragment.WebLink,
-                "Link.document": Fragment.DocumentLink,
-                "Link.image": Fragment.MediaLink,
-                "Link.file": Fragment.FileLink
-            }.get(hyperlink_type, lambda x: None)(data.get("value"))
+            link_type = _LINK_TYPES.get(data.get("type"))
+            return link_type(data.get("value")) if link_type else None
 
     class DocumentLink(WithFragments, Link):
-        def __init__(self, value):
-            Fragment.WithFragments.__init__(self, {})
+        __slots__ = ("id", "uid", "type", "tags", "slug", "is_broken", "_raw_fragments", "_fragments")
 
+        def __init__(self, value):
             document = value.get("document")
 
             self.id = document.get("id")
@@ -231,17 +239,19 @@ class Fragment(object):
             self.slug = document.get("slug")
             self.is_broken = value.get("isBroken")
 
-            fragments = document.get("data").get(self.type) if "data" in document else {}
-            for (fragment_name, fragment_value) in list(fragments.items()):
-                f_key = "%s.%s" % (self.type, fragment_name)
+            # Most links are only passed to a link resolver, their fragments are parsed the first time they are read
+            self._raw_fragments = document.get("data").get(self.type) if "data" in document else {}
+            self._fragments = None
 
-                if isinstance(fragment_value, list):
-                    for index, fragment_value_element in enumerate(fragment_value):
-                        self.fragments["%s[%s]" % (f_key, index)] = Fragment.from_json(
-                            fragment_value_element)
+        @property
+        def fragments(self):
+            if self._fragments is None:
+                self._fragments = self.parse_fragments(self.type, self._raw_fragments)
+            return self._fragments
 
-                elif isinstance(fragment_value, dict):
-                    self.fragments[f_key] = Fragment.from_json(fragment_value)
+        @fragments.setter
+        def fragments(self, fragments):
+            self._fragments = fragments
 
         def as_html(self, documentlink_resolver, html_serializer=None):
             """Get the DocumentLink as html.
@@ -251,10 +261,7 @@ class Fragment(object):
             Resolver function should return a string, the local url to the document.
 
             """
-            return """<a href="%(link)s">%(slug)s</a>""" % {
-                "link": self.get_url(documentlink_resolver),
-                "slug": self.slug
-            }
+            return f"""<a href="{self.get_url(documentlink_resolver)}">{self.slug}</a>"""
 
         def get_url(self, documentlink_resolver=None):
             if not hasattr(documentlink_resolver, '__call__'):
@@ -280,17 +287,21 @@ class Fragment(object):
             return "DocumentLink %s, %s, %s, %s" % (self.id, self.type, self.tags, self.is_broken)
 
     class WebLink(Link):
+        __slots__ = ("url",)
+
         def __init__(self, value):
             self.url = value.get("url")
 
         @property
         def as_html(self):
-            return """<a href="%(url)s">%(url)s</a>""" % self.__dict__
+            return f"""<a href="{self.url}">{self.url}</a>"""
 
         def get_url(self, link_resolver=None):
             return self.url
 
     class MediaLink(Link):
+        __slots__ = ("image", "name", "kind", "url", "size", "height", "width")
+
         def __init__(self, value):
             self.image = value.get("image")
             self.name = self.image.get("name")
@@ -301,12 +312,14 @@ class Fragment(object):
             self.width = self.image.get("width")
 
         def as_html(self):
-            return "<a href='%(url)s'>%(name)s</a>" % self.__dict__
+            return f"<a href='{self.url}'>{self.name}</a>"
 
         def get_url(self, link_resolver=None):
             return self.url
 
     class FileLink(Link):
+        __slots__ = ("file", "url", "kind", "size", "name")
+
         def __init__(self, value):
             self.file = value.get("file")
             self.url = self.file.get("url")
@@ -315,7 +328,7 @@ class Fragment(object):
             self.name = self.file.get("name")
 
         def as_html(self):
-            return "<a href='%(url)s'>%(name)s</a>" % self.__dict__
+            return f"<a href='{self.url}'>{self.name}</a>"
 
         def get_file(self):
             return self.file
@@ -327,6 +340,8 @@ class Fragment(object):
             return self.url
 
     class ImageLink(Link):
+        __slots__ = ("image", "url", "alt")
+
         def __init__(self, value):
             self.image = value.get("image")
             self.url = self.image.get("url")
@@ -334,7 +349,7 @@ class Fragment(object):
 
         @property
         def as_html(self):
-                return """<a href="%(url)s"><img src="%(url)s" alt="%(alt)s"/></a>""" % self.__dict__
+                return f"""<a href="{self.url}"><img src="{self.url}" alt="{self.alt}"/></a>"""
 
         def get_image(self):
                 return self.image
@@ -343,10 +358,11 @@ class Fragment(object):
                 return self.url
 
     class Image(FragmentElement):
-        _View = namedtuple('View', ['url', 'width', 'height', 'linkTo'])
+        __slots__ = ("main", "views", "link_to")
 
         class View(FragmentElement):
             """View class"""
+            __slots__ = ("url", "width", "height", "alt", "copyright", "link_to", "label")
 
             def __init__(self, data):
                 self.url = data["url"]
@@ -358,20 +374,12 @@ class Fragment(object):
                 self.label = data.get("label")
 
             def as_html(self, link_resolver):
-                img_tag = """<img src="%(url)s" alt="%(alt)s" width="%(width)s" height="%(height)s" />""" % {
-                    'url': self.url,
-                    'width': self.width,
-                    'height': self.height,
-                    'alt': self.alt if (self.alt is not None) else ""
-                }
+                alt = self.alt if (self.alt is not None) else ""
+                img_tag = f"""<img src="{self.url}" alt="{alt}" width="{self.width}" height="{self.height}" />"""
                 if self.link_to is None:
                     return img_tag
                 else:
-                    url = self.link_to.get_url(link_resolver)
-                    return """<a href="%(url)s">%(content)s</a>""" % {
-                        'url': url,
-                        'content': img_tag
-                    }
+                    return f"""<a href="{self.link_to.get_url(link_resolver)}">{img_tag}</a>"""
 
             @property
             def ratio(self):
@@ -397,42 +405,42 @@ class Fragment(object):
             if self.link_to is None:
                 return view_html
             else:
-                return """<a href="%(url)s">%(content)s</a>""" % {
-                    'url': self.link_to.get_url(link_resolver),
-                    'content': view_html
-                }
+                return f"""<a href="{self.link_to.get_url(link_resolver)}">{view_html}</a>"""
 
     class Embed(FragmentElement):
+        __slots__ = ("type", "provider", "url", "width", "height", "html")
+
         def __init__(self, value):
-            oembed = value.get("oembed")
-            self.type = oembed.get("type")
-            self.provider = oembed.get("provider_name")
-            self.provider = oembed.get("provider_name")
-            self.url = oembed.get("embed_url")
-            self.width = oembed.get("width")
-            self.height = oembed.get("height")
-            self.html = oembed.get("html")
+            get = value.get("oembed").get
+            self.type = get("type")
+            self.provider = get("provider_name")
+            self.url = get("embed_url")
+            self.width = get("width")
+            self.height = get("height")
+            self.html = get("html")
 
         @property
         def as_html(self):
-            return ("""<div data-oembed="%(url)s" data-oembed-type="%(type)s" data-oembed-provider="%(provider)s">"""
-                    "%(html)s"
-                    "</div>") % self.__dict__
+            return (f"""<div data-oembed="{self.url}" data-oembed-type="{self.type}" """
+                    f"""data-oembed-provider="{self.provider}">{self.html}</div>""")
 
     class GeoPoint(FragmentElement):
+        __slots__ = ("latitude", "longitude")
+
         def __init__(self, value):
             self.latitude = value.get("latitude")
             self.longitude = value.get("longitude")
 
         @property
         def as_html(self):
-            return ("""<div class="geopoint"><span class="latitude">"""
-                    """%(latitude)f</span><span class="longitude">%(longitude)f</span>"""
-                    """</div>""") % self.__dict__
+            return (f"""<div class="geopoint"><span class="latitude">{self.latitude:f}</span>"""
+                    f"""<span class="longitude">{self.longitude:f}</span></div>""")
 
     # Basic fragments
 
     class BasicFragment(FragmentElement):
+        __slots__ = ("value",)
+
         def __init__(self, value):
             self.value = value
 
@@ -440,69 +448,83 @@ class Fragment(object):
             return self.value.__str__()
 
     class Number(BasicFragment):
+        __slots__ = ()
 
         @property
         def as_html(self):
-            return """<span class="number">%g</span>""" % self.value
+            return f"""<span class="number">{self.value:g}</span>"""
 
     class Range(BasicFragment):
+        __slots__ = ()
 
         @property
         def as_html(self):
-            return """<span class="range">%s</span>""" % self.value
+            return f"""<span class="range">{self.value}</span>"""
 
     class Color(BasicFragment):
+        __slots__ = ()
 
         @property
         def as_html(self):
-            return """<span class="color">%s</span>""" % self.value
+            return f"""<span class="color">{self.value}</span>"""
 
     class Text(BasicFragment):
+        __slots__ = ()
 
         @property
         def as_html(self):
-            return """<span class="text">%s</span>""" % html.escape(self.value)
+            return _text_as_html(self.value)
 
     class Date(BasicFragment):
+        __slots__ = ("_datetime",)
+
+        def __init__(self, value):
+            Fragment.BasicFragment.__init__(self, value)
+            self._datetime = None
 
         @property
         def as_datetime(self):
-            return datetime.datetime(*map(int, re.split('[^\d]', self.value)))
+            if self._datetime is None:
+                self._datetime = datetime.datetime(*map(int, _DATE_SPLIT(self.value)))
+            return self._datetime
 
         @property
         def as_html(self):
-            return """<time>%s</time>""" % self.value
+            return f"""<time>{self.value}</time>"""
 
     class Timestamp(BasicFragment):
+        __slots__ = ("_datetime",)
+
+        def __init__(self, value):
+            Fragment.BasicFragment.__init__(self, value)
+            self._datetime = None
 
         @property
         def as_datetime(self):
-            return datetime.datetime(*map(int, re.split('[^\d]', self.value)))
+            if self._datetime is None:
+                self._datetime = datetime.datetime(*map(int, _DATE_SPLIT(self.value)))
+            return self._datetime
 
         @property
         def as_html(self):
-            return """<time>%s</time>""" % self.value
+            return f"""<time>{self.value}</time>"""
 
     class Group(BasicFragment):
+        __slots__ = ()
 
         def __init__(self, value):
-            self.value = []
-            for elt in value:
-                fragments = {}
-                for name, frag in elt.items():
-                    fragments[name] = Fragment.from_json(frag)
-                self.value.append(Fragment.WithFragments(fragments))
+            self.value = [
+                Fragment.WithFragments({name: Fragment.from_json(frag) for name, frag in elt.items()}) for elt in value
+            ]
 
         def as_html(self, link_resolver):
-            html_list = []
-            for group_doc in self.value:
-                html_list.append(group_doc.as_html(link_resolver))
-            return "\n".join(html_list)
+            return "\n".join([group_doc.as_html(link_resolver) for group_doc in self.value])
 
         def __iter__(self):
             return iter(self.value)
 
     class Slice(FragmentElement):
+        __slots__ = ("slice_type", "slice_label", "value")
 
         def __init__(self, slice_type, slice_label, value):
             self.slice_type = slice_type
@@ -513,13 +535,11 @@ class Fragment(object):
             classes = ['slice']
             if self.slice_label is not None:
                 classes.append(self.slice_label)
-            return '<div data-slicetype="%(slice_type)s" class="%(classes)s">%(body)s</div>' % {
-                "slice_type": self.slice_type,
-                "classes": ' '.join(classes),
-                "body": self.value.as_html(link_resolver)
-            }
+            body = self.value.as_html(link_resolver)
+            return f'<div data-slicetype="{self.slice_type}" class="{" ".join(classes)}">{body}</div>'
 
     class CompositeSlice(FragmentElement):
+        __slots__ = ("slice_type", "slice_label", "repeat", "non_repeat")
 
         def __init__(self, slice_type, slice_label, elt):
             self.slice_type = slice_type
@@ -530,7 +550,8 @@ class Fragment(object):
             _repeat = elt.get('repeat')
             _non_repeat = elt.get('non-repeat')
 
-            if any(_repeat):
+            # An empty repeatable zone comes as a list of empty items, which must not be rendered
+            if _repeat and any(_repeat):
                 self.repeat = self.parse_repeat(_repeat)
 
             if _non_repeat:
@@ -556,13 +577,10 @@ class Fragment(object):
             if self.repeat:
                 body += self.repeat.as_html(link_resolver)
 
-            return '<div data-slicetype="%(slice_type)s" class="%(classes)s">%(body)s</div>' % {
-                "slice_type": self.slice_type,
-                "classes": ' '.join(classes),
-                "body": body
-            }
+            return f'<div data-slicetype="{self.slice_type}" class="{" ".join(classes)}">{body}</div>'
 
     class SliceZone(FragmentElement):
+        __slots__ = ("slices",)
 
         def __init__(self, value):
             self.slices = []
@@ -575,45 +593,34 @@ class Fragment(object):
                     fragment = Fragment.from_json(elt['value'])
                     self.slices.append(Fragment.Slice(slice_type, slice_label, fragment))
                 else:
-                    Fragment.CompositeSlice(slice_type, slice_label, elt)
                     self.slices.append(Fragment.CompositeSlice(slice_type, slice_label, elt))
 
         def as_html(self, link_resolver):
-            html_list = []
-            for slice in self.slices:
-                html_list.append(slice.as_html(link_resolver))
-            return "\n".join(html_list)
+            return "\n".join([slice.as_html(link_resolver) for slice in self.slices])
 
         def __iter__(self):
             return iter(self.slices)
 
 
-class StructuredText(object):
+def _list_tag(block):
+    if isinstance(block, Block.ListItem):
+        return "ol" if block.is_ordered else "ul"
+    return None
 
-    def __init__(self, values):
-        types = {
-            "heading1": Block.Heading,
-            "heading2": Block.Heading,
-            "heading3": Block.Heading,
-            "heading4": Block.Heading,
-            "heading5": Block.Heading,
-            "heading6": Block.Heading,
-            "paragraph": Block.Paragraph,
-            "list-item": Block.ListItem,
-            "o-list-item": lambda val: Block.ListItem(val, True),
-            "image": lambda val: Block.Image(Fragment.Image.View(val)),
-            "embed": lambda val: Block.Embed(Fragment.Embed(val)),
-        }
 
+class StructuredText:
+    __slots__ = ("blocks",)
+
+    def __init__(self, values):
         blocks = []
 
         for value in values:
             text_type = value.get("type")
-            type_class = types.get(text_type)
+            type_class = _BLOCK_TYPES.get(text_type)
             if type_class:
                 blocks.append(type_class(value))
             else:
-                log.warning("StructuredText, type not found: %s" % text_type)
+                log.warning("StructuredText, type not found: %s", text_type)
 
         self.blocks = blocks
 
@@ -626,49 +633,25 @@ class StructuredText(object):
     def get_image(self):
         return next(p for p in self.blocks if isinstance(p, Block.Image))
 
-    class Group(object):
-        def __init__(self, tag, blocks):
-            self.tag = tag
-            self.blocks = blocks
-
     def as_html(self, link_resolver, html_serializer=None):
-        groups = []
-        for block in self.blocks:
-            if len(groups) > 0:
-                last_one = groups[-1:][0]
-
-                if last_one.tag == "ul" and isinstance(block, Block.ListItem) and not block.is_ordered:
-                    last_one.blocks.append(block)
-                elif last_one.tag == "ol" and isinstance(block, Block.ListItem) and block.is_ordered:
-                    last_one.blocks.append(block)
-                elif isinstance(block, Block.ListItem) and not block.is_ordered:
-                    groups.append(StructuredText.Group("ul", [block]))
-                elif isinstance(block, Block.ListItem) and block.is_ordered:
-                    groups.append(StructuredText.Group("ol", [block]))
-                else:
-                    groups.append(StructuredText.Group(None, [block]))
-            else:
-                if isinstance(block, Block.ListItem) and not block.is_ordered:
-                    groups.append(StructuredText.Group("ul", [block]))
-                elif isinstance(block, Block.ListItem) and block.is_ordered:
-                    groups.append(StructuredText.Group("ol", [block]))
-                else:
-                    groups.append(StructuredText.Group(None, [block]))
-
         html_list = []
-        for group in groups:
-            if group.tag is not None:
-                html_list.append("<%(tag)s>" % group.__dict__)
-            for block in group.blocks:
+        append = html_list.append
+        span_as_html = StructuredText.span_as_html
+        block_as_html = StructuredText.block_as_html
+        # Consecutive list items of the same kind are wrapped together in a single <ul> or <ol>
+        for tag, group in groupby(self.blocks, key=_list_tag):
+            if tag is not None:
+                append(f"<{tag}>")
+            for block in group:
                 content = ""
                 if isinstance(block, Text):
-                    content = StructuredText.span_as_html(block.text, block.spans, link_resolver, html_serializer)
-                html_list.append(StructuredText.block_as_html(block, content, link_resolver, html_serializer))
-            if group.tag is not None:
-                html_list.append("</%(tag)s>" % group.__dict__)
+                    content = span_as_html(block.text, block.spans, link_resolver, html_serializer)
+                append(block_as_html(block, content, link_resolver, html_serializer))
+            if tag is not None:
+                append(f"</{tag}>")
 
         html_str = ''.join(html_list)
-        log.debug("as_html result: %s" % html_str)
+        log.debug("as_html result: %s", html_str)
         return html_str
 
     @staticmethod
@@ -677,26 +660,9 @@ class StructuredText(object):
             custom_html = html_serializer(block, content)
             if custom_html is not None:
                 return custom_html
-        cls = ""
-        if isinstance(block, Text) and block.label is not None:
-            cls = " class=\"%s\"" % block.label
-        if isinstance(block, Block.Heading):
-            return "<h%(level)s%(cls)s>%(html)s</h%(level)s>" % {
-                "level": block.level,
-                "cls": cls,
-                "html": content
-            }
-        elif isinstance(block, Block.Paragraph):
-            return "<p%s>%s</p>" % (cls, content)
-        elif isinstance(block, Block.ListItem):
-            return "<li%s>%s</li>" % (cls, content)
-        elif isinstance(block, Block.Image):
-            all_classes = ["block-img"]
-            if block.view.label is not None:
-                all_classes.append(block.view.label)
-            return "<p class=\"%s\">%s</p>" % (" ".join(all_classes), block.get_view().as_html(link_resolver))
-        elif isinstance(block, Block.Embed):
-            return block.get_embed().as_html
+        render = _BLOCK_RENDERERS.get(type(block)) or _find_base_renderer(_BLOCK_RENDERERS, block)
+        if render is not None:
+            return render(block, content, link_resolver)
 
     @staticmethod
     def span_write_tag(span, content, link_resolver, html_serializer):
@@ -704,145 +670,139 @@ class StructuredText(object):
             custom_html = html_serializer(span, content)
             if custom_html is not None:
                 return custom_html
-        if isinstance(span, Span.Em):
-            return "<em>" + content + "</em>"
-        elif isinstance(span, Span.Strong):
-            return "<strong>" + content + "</strong>"
-        elif isinstance(span, Span.Hyperlink):
-            return """<a href="%s">""" % span.get_url(link_resolver) + content + "</a>"
-        else:
-            cls = ""
-            if span.label is not None:
-                cls = " class=\"%s\"" % span.label
-            return """<span%s>%s</span>""" % (cls, content)
+        render = _SPAN_RENDERERS.get(type(span)) or _find_base_renderer(_SPAN_RENDERERS, span)
+        return render(span, content, link_resolver)
 
     @staticmethod
     def span_as_html(text, spans, link_resolver, html_serializer):
         html_list = []
-        tags_start = defaultdict(list)
-        tags_end = defaultdict(list)
-        for span in spans:
-            tags_start[span.start].append(span)
-
-        for span in reversed(spans):
-            tags_end[span.end].append(span)
+        # Offsets before the text are never reached, like offsets past its end.
+        # Spans opening at the same offset are opened longest first so that the longest one wraps the others.
+        starts = sorted((span for span in reversed(spans) if span.start >= 0), key=lambda s: (s.start, s.start - s.end))
+        # One (offset, opens, span) event per tag boundary, tags closing at an offset come before the ones opening there
+        events = [(span.end, False, None) for span in spans if span.end >= 0]
+        events.extend((span.start, True, span) for span in starts)
+        events.sort(key=itemgetter(0, 1))
+        text_length = len(text)
+        escape = html.escape
 
-        index = 0
         stack = []
-        for index, letter in enumerate(text):
-            if index in tags_end:
-                for end_tag in tags_end.get(index):
-                    # Close a tag
-                    tag = stack.pop()
-                    inner_html = StructuredText.span_write_tag(tag["span"], tag["content"], link_resolver, html_serializer)
-                    if len(stack) == 0:
-                        # The tag was top-level
-                        html_list.append(inner_html)
-                    else:
-                        # Add the content to the parent tag
-                        stack[-1]["content"] += inner_html
-            if index in tags_start:
-
-                for span in reversed(sorted(tags_start.get(index), key=lambda s: s.length())):
-                    # Open a tag
-                    stack.append({
-                        "span": span,
-                        "content": ""
-                    })
+
+        def write(content):
             if len(stack) == 0:
-                # Top-level text
-                html_list.append(html.escape(letter))
+                # Top-level content
+                html_list.append(content)
             else:
-                # Inner text of a span
-                stack[-1]["content"] += html.escape(letter)
+                # Inner content of a span
+                stack[-1]["content"].append(content)
 
-        # Check for the tags after the end of the string
-        while len(stack) > 0:
-            # Close a tag
+        def close_tag():
             tag = stack.pop()
-            inner_html = StructuredText.span_write_tag(tag["span"], tag["content"], link_resolver, html_serializer)
-            if len(stack) == 0:
-                # The tag was top-level
-                html_list.append(inner_html)
+            write(StructuredText.span_write_tag(tag["span"], ''.join(tag["content"]), link_resolver, html_serializer))
+
+        # Only the offsets where a tag opens or closes split the text, everything in between is escaped at once
+        position = 0
+        for index, opens, span in events:
+            if index >= text_length:
+                break
+            if index != position:
+                write(escape(text[position:index]))
+                position = index
+            if opens:
+                # Open a tag
+                stack.append({
+                    "span": span,
+                    "content": []
+                })
             else:
-                # Add the content to the parent tag
-                stack[-1]["content"] += inner_html
+                close_tag()
+        write(escape(text[position:]))
+
+        # Check for the tags after the end of the string
+        while len(stack) > 0:
+            close_tag()
 
         return ''.join(html_list)
 
 
-class Span(object):
+class Span:
 
-    @classmethod
-    def from_json(cls, data):
-        return {
-            "strong": Span.Strong,
-            "em": Span.Em,
-            "hyperlink": Span.Hyperlink
-        }.get(data.get("type"), Span.SpanElement)(data)
+    @staticmethod
+    def from_json(data):
+        return _SPAN_TYPES.get(data.get("type"), Span.SpanElement)(data)
 
-    class SpanElement(object):
+    class SpanElement:
+        __slots__ = ("start", "end", "label")
 
         def __init__(self, value):
-            self.start = value.get("start")
-            self.end = value.get("end")
-            if value.get("data") is not None:
-                self.label = value.get("data").get("label")
-            else:
-                self.label = None
+            self.start = value["start"]
+            self.end = value["end"]
+            data = value.get("data")
+            label = data.get("label") if data is not None else None
+            self.label = sys.intern(label) if label is not None else None
 
         def length(self):
             return self.end - self.start
 
     class Em(SpanElement):
-        pass
+        __slots__ = ()
 
     class Strong(SpanElement):
-        pass
+        __slots__ = ()
 
     class Hyperlink(SpanElement):
+        __slots__ = ("link",)
+
         def __init__(self, value):
             super(Span.Hyperlink, self).__init__(value)
             data = value.get('data')
             self.link = Fragment.Link.parse(data)
             if self.link is None:
-                log.warning("StructuredText::Span::Hyperlink type not found: %s" % data.get('type'))
+                log.warning("StructuredText::Span::Hyperlink type not found: %s", data.get("type"))
 
         def get_url(self, link_resolver):
             return self.link.get_url(link_resolver)
 
 
-class Text(object):
+class Text:
     """Base class for blocks"""
+    __slots__ = ("text", "spans", "label")
+
     def __init__(self, value):
         self.text = value.get("text")
         self.spans = [Span.from_json(span) for span in value.get("spans")]
-        self.label = value.get("label")
+        label = value.get("label")
+        # The same few labels come back on most blocks of a document
+        self.label = sys.intern(label) if label is not None else None
 
 
-class Block(object):
+class Block:
 
     """A block in a structured text"""
     pass
 
     class Heading(Text):
+        __slots__ = ("level",)
 
-        def __init__(self, value):
+        def __init__(self, value, level=None):
             super(Block.Heading, self).__init__(value)
-            self.level = value.get("type")[-1]
+            self.level = level if level is not None else value.get("type")[-1]
 
     class Paragraph(Text):
+        __slots__ = ()
 
         def __init__(self, value):
             super(Block.Paragraph, self).__init__(value)
 
     class ListItem(Text):
+        __slots__ = ("is_ordered",)
 
         def __init__(self, value, is_ordered=False):
             super(Block.ListItem, self).__init__(value)
             self.is_ordered = is_ordered
 
-    class Embed(object):
+    class Embed:
+        __slots__ = ("obj",)
 
         def __init__(self, embed):
             self.obj = embed
@@ -850,13 +810,185 @@ class Block(object):
         def get_embed(self):
             return self.obj
 
-    class Image(object):
+    class Image:
         """Block image
 
         :param view: The Fragment.Image.View object
         """
+        __slots__ = ("view",)
+
         def __init__(self, view):
             self.view = view
 
         def get_view(self):
             return self.view
+
+
+# Blocks holding text and spans.
+_TEXT_BLOCK_TYPES = frozenset((Block.Heading, Block.Paragraph, Block.ListItem))
+
+
+def _ordered_list_item(value):
+    return Block.ListItem(value, True)
+
+
+def _image_block(value):
+    return Block.Image(Fragment.Image.View(value))
+
+
+def _embed_block(value):
+    return Block.Embed(Fragment.Embed(value))
+
+
+# Block constructors by the block type name used in the json API.
+_BLOCK_TYPES = {
+    "heading1":    partial(Block.Heading, level="1"),
+    "heading2":    partial(Block.Heading, level="2"),
+    "heading3":    partial(Block.Heading, level="3"),
+    "heading4":    partial(Block.Heading, level="4"),
+    "heading5":    partial(Block.Heading, level="5"),
+    "heading6":    partial(Block.Heading, level="6"),
+    "paragraph":   Block.Paragraph,
+    "list-item":   Block.ListItem,
+    "o-list-item": _ordered_list_item,
+    "image":       _image_block,
+    "embed":       _embed_block,
+}
+
+# Fragment classes by the type name used in the json API.
+_FRAGMENT_TYPES = {
+    "Image":          Fragment.Image,
+    "Color":          Fragment.Color,
+    "Text":           Fragment.Text,
+    "Select":         Fragment.Text,
+    "Number":         Fragment.Number,
+    "Range":          Fragment.Range,
+    "Date":           Fragment.Date,
+    "Timestamp":      Fragment.Timestamp,
+    "StructuredText": StructuredText,
+    "Link.document":  Fragment.DocumentLink,
+    "Link.file":      Fragment.FileLink,
+    "Link.web":       Fragment.WebLink,
+    "Link.image":     Fragment.ImageLink,
+    "Embed":          Fragment.Embed,
+    "GeoPoint":       Fragment.GeoPoint,
+    "Group":          Fragment.Group,
+    "SliceZone":      Fragment.SliceZone
+}
+
+# Link classes by the type name used in the json API, for links nested in images and spans.
+_LINK_TYPES = {
+    "Link.web":      Fragment.WebLink,
+    "Link.document": Fragment.DocumentLink,
+    "Link.image":    Fragment.MediaLink,
+    "Link.file":     Fragment.FileLink
+}
+
+# Span classes by the type name used in the json API, other spans are labels.
+_SPAN_TYPES = {
+    "strong":    Span.Strong,
+    "em":        Span.Em,
+    "hyperlink": Span.Hyperlink
+}
+
+
+# HTML renderers, looked up by the exact type of the fragment, block or span to avoid isinstance chains.
+
+def _find_base_renderer(renderers, obj):
+    """Finds the renderer of a subclass of the rendered types, None if there is none.
+
+    The renderer found is registered for the subclass, so that its next instances are found by their exact type.
+    """
+    obj_type = type(obj)
+    for base in obj_type.__mro__[1:]:
+        render = renderers.get(base)
+        if render is not None:
+            renderers[obj_type] = render
+            return render
+    return None
+
+
+def _structured_text_as_html(fragment, link_resolver, html_serializer):
+    return fragment.as_html(link_resolver, html_serializer)
+
+
+def _fragment_as_html(fragment, link_resolver, html_serializer):
+    return fragment.as_html(link_resolver)
+
+
+def _fragment_html_property(fragment, link_resolver, html_serializer):
+    return fragment.as_html
+
+
+_FRAGMENT_RENDERERS = {
+    StructuredText: _structured_text_as_html,
+    Fragment.Group: _fragment_as_html,
+    Fragment.SliceZone: _fragment_as_html,
+    Fragment.DocumentLink: _fragment_as_html,
+    Fragment.Image: _fragment_as_html,
+    Fragment.Image.View: _fragment_as_html,
+    FragmentElement: _fragment_html_property,
+}
+
+
+def _block_class(block):
+    return "" if block.label is None else f" class=\"{block.label}\""
+
+
+def _heading_as_html(block, content, link_resolver):
+    return f"<h{block.level}{_block_class(block)}>{content}</h{block.level}>"
+
+
+def _paragraph_as_html(block, content, link_resolver):
+    return f"<p{_block_class(block)}>{content}</p>"
+
+
+def _list_item_as_html(block, content, link_resolver):
+    return f"<li{_block_class(block)}>{content}</li>"
+
+
+def _image_block_as_html(block, content, link_resolver):
+    all_classes = ["block-img"]
+    if block.view.label is not None:
+        all_classes.append(block.view.label)
+    return f"<p class=\"{' '.join(all_classes)}\">{block.get_view().as_html(link_resolver)}</p>"
+
+
+def _embed_block_as_html(block, content, link_resolver):
+    return block.get_embed().as_html
+
+
+_BLOCK_RENDERERS = {
+    Block.Heading: _heading_as_html,
+    Block.Paragraph: _paragraph_as_html,
+    Block.ListItem: _list_item_as_html,
+    Block.Image: _image_block_as_html,
+    Block.Embed: _embed_block_as_html,
+}
+
+
+def _em_as_html(span, content, link_resolver):
+    return f"<em>{content}</em>"
+
+
+def _strong_as_html(span, content, link_resolver):
+    return f"<strong>{content}</strong>"
+
+
+def _hyperlink_as_html(span, content, link_resolver):
+    return f"""<a href="{span.get_url(link_resolver)}">{content}</a>"""
+
+
+def _span_as_html(span, content, link_resolver):
+    cls = ""
+    if span.label is not None:
+        cls = f" class=\"{span.label}\""
+    return f"""<span{cls}>{content}</span>"""
+
+
+_SPAN_RENDERERS = {
+    Span.Em: _em_as_html,
+    Span.Strong: _strong_as_html,
+    Span.Hyperlink: _hyperlink_as_html,
+    Span.SpanElement: _span_as_html,
+}
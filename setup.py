@@ -29,11 +29,14 @@ setup(
         'Intended Audience :: Developers',
         "Environment :: Web Environment",
         "Framework :: AsyncIO",
-        'Programming Language :: Python :: 3.6'
+        'Programming Language :: Python :: 3.7'
     ],
     install_requires=[
-        'httpx',
+        'httpx[http2]',
         'aiocache'
     ],
-    python_requires='>=3.6'
+    extras_require={
+        'orjson': ['orjson']
+    },
+    python_requires='>=3.7'
 )
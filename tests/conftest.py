@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Shared configuration of the Prismic library tests"""
+
+import socket
+
+import pytest
+
+PRISMIC_HOST = ("micro.prismic.io", 80)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "integration: test querying the micro.prismic.io repository")
+
+
+def _prismic_reachable():
+    try:
+        socket.create_connection(PRISMIC_HOST, timeout=1).close()
+    except OSError:
+        return False
+    return True
+
+
+def pytest_collection_modifyitems(config, items):
+    # Probe the repository once, rather than letting every integration test fail on its own
+    integration_items = [item for item in items if item.get_closest_marker("integration")]
+    if integration_items and not _prismic_reachable():
+        skip = pytest.mark.skip(reason=f"{PRISMIC_HOST[0]} is not reachable")
+        for item in integration_items:
+            item.add_marker(skip)
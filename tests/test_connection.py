@@ -3,9 +3,14 @@
 
 """Tests for Prismic library"""
 
-from __future__ import (absolute_import, division, print_function, unicode_literals)
+import asyncio
+
+import httpx
+import pytest
+from aiocache import Cache
 
 from prismic import connection
+from prismic.exceptions import HTTPError
 
 
 def test_missing_header_key():
@@ -13,3 +18,136 @@ def test_missing_header_key():
     max_age = connection.get_max_age(headers)
     assert max_age is None
 
+
+def test_max_age_header():
+    assert connection.get_max_age({"Cache-Control": "max-age=315360000"}) == 315360000
+    assert connection.get_max_age({"Cache-Control": "public, max-age=60, must-revalidate"}) == 60
+    assert connection.get_max_age({"Cache-Control": "no-cache"}) is None
+    assert connection.get_max_age({"Cache-Control": "max-age="}) is None
+    assert connection.get_max_age({"Cache-Control": "max-age=²"}) is None
+
+
+def test_jitter_ttl():
+    for _ in range(100):
+        assert 54 <= connection.jitter_ttl(60) <= 66
+        assert connection.jitter_ttl(1) == 1
+
+
+def test_cache_key():
+    assert connection.get_cache_key("http://repo/api", {}) == "http://repo/api"
+    assert connection.get_cache_key("http://repo/api", {"ref": "a", "q": ["[[x]]"]}) == \
+        connection.get_cache_key("http://repo/api", {"q": ["[[x]]"], "ref": "a"})
+    assert connection.get_cache_key("http://repo/api", {"ref": "a"}) != \
+        connection.get_cache_key("http://repo/api", {"ref": "b"})
+
+
+def test_default_client_is_shared():
+    async def default_clients():
+        client = connection.get_default_client()
+        assert connection.get_default_client() is client
+        await connection.aclose_default_client()
+        assert client.is_closed
+        reopened = connection.get_default_client()
+        await connection.aclose_default_client()
+        return client, reopened
+
+    # Each run has an event loop, and so a default client, of its own: the one of the cooperative tests is left alone
+    closed, reopened = asyncio.run(default_clients())
+    assert reopened is not closed
+    other_loop, _ = asyncio.run(default_clients())
+    assert other_loop is not closed
+
+
+@pytest.mark.asyncio_cooperative
+async def test_get_json_params():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"results": []})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await connection.get_json(
+            "http://repo/api/documents/search", {"q": ["[[a]]", "[[b]]"], "page": 2}, "token", client=client
+        )
+
+    assert result == {"results": []}
+    params = requests[0].url.params
+    assert params.get_list("q") == ["[[a]]", "[[b]]"]
+    assert params["page"] == "2"
+    assert params["access_token"] == "token"
+
+
+@pytest.mark.asyncio_cooperative
+async def test_get_json_max_age_zero():
+    cache = Cache(Cache.MEMORY)
+
+    def handler(request):
+        headers = {"Cache-Control": "max-age=%s" % request.url.params["max_age"]}
+        return httpx.Response(200, json={"results": []}, headers=headers)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for max_age in ("0", "60"):
+            await connection.get_json(
+                "http://repo/api/documents/search", {"max_age": max_age}, cache=cache, client=client, default_ttl=5
+            )
+
+    assert await cache.get(connection.get_cache_key("http://repo/api/documents/search", {"max_age": "0"})) is None
+    assert await cache.get(connection.get_cache_key("http://repo/api/documents/search", {"max_age": "60"})) == \
+        {"results": []}
+
+
+@pytest.mark.asyncio_cooperative
+async def test_get_json_concurrent_misses():
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"results": []})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        results = await asyncio.gather(*[
+            connection.get_json("http://repo/api/documents/search", {"ref": "a"}, client=client) for _ in range(5)
+        ])
+
+    assert results == [{"results": []}] * 5
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio_cooperative
+async def test_get_json_concurrent_errors():
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(500, text="Oops")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        results = await asyncio.gather(*[
+            connection.get_json("http://repo/api/documents/search", client=client) for _ in range(2)
+        ], return_exceptions=True)
+
+    assert all(isinstance(result, HTTPError) and result.code == 500 for result in results)
+
+
+@pytest.mark.asyncio_cooperative
+async def test_get_json_concurrent_leader_cancelled():
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"results": []})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        leader = asyncio.ensure_future(connection.get_json("http://repo/api/documents/search", client=client))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(connection.get_json("http://repo/api/documents/search", client=client))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        # The waiter does not inherit the cancellation of the first caller, it fetches the request itself
+        assert await waiter == {"results": []}
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    assert len(requests) == 2
@@ -3,14 +3,10 @@
 
 """Experiments Tests for Prismic library"""
 
-from __future__ import (absolute_import, division, print_function, unicode_literals)
-
-import json
-
 from pytest import fixture
 
 import prismic
-import unittest
+from prismic.connection import json_loads
 from prismic.experiments import Experiments
 
 experiments_json = """
@@ -55,9 +51,9 @@ experiments_json = """
 }"""
 
 
-@fixture()
+@fixture(scope="module")
 def experiments():
-    return Experiments.parse(json.loads(experiments_json))
+    return Experiments.parse(json_loads(experiments_json))
 
 
 def test_parsing(experiments):
@@ -78,4 +74,5 @@ def test_cookie_parsing(experiments):
     assert experiments.ref_from_cookie('_UQtin7EQAOH5M34RQq6Dg%20-1') is None, 'Negative index overflow'
     assert experiments.ref_from_cookie('NotAGoodLookingId%200') is None, 'Unknown Google ID'
     assert experiments.ref_from_cookie('NotAGoodLookingId%201') is None, 'Unknown Google ID'
+    assert experiments.ref_from_cookie('_UQtin7EQAOH5M34RQq6Dg%20x') is None, 'Invalid index'
 